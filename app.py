@@ -1,65 +1,110 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import json
+import logging
+import time
 from auth import Auth
 from database import TaskDB
-from typing import Optional
-from google.cloud import aiplatform
-from vertexai.generative_models import GenerativeModel
+from vertexai.generative_models import GenerativeModel, GenerationConfig
 import vertexai
 from google.oauth2 import service_account
 
 
+logging.basicConfig(level=logging.WARNING)
+log = logging.getLogger(__name__)
+
+@st.cache_resource(show_spinner=False)
+def get_db():
+    """One TaskDB per server process - Streamlit re-executes module-level
+    code on every rerun, so the connection, pragmas and migrations must
+    live behind cache_resource to actually run once"""
+    return TaskDB()
+
 # Initialize authentication and database
-auth = Auth()
-db = TaskDB()
+db = get_db()
+auth = Auth(db)
 
+# Constrain Gemini to emit a parseable JSON array of task objects
+# server-side, so no code-fence stripping or parse retries are needed
+_TASK_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "task": {"type": "string"},
+            "customer": {"type": "string"},
+            "due_date": {"type": "string"},
+            "priority": {"type": "string", "enum": ["High", "Medium", "Low"]},
+        },
+        "required": ["task", "customer", "due_date", "priority"],
+    },
+}
+# A parsed task object is well under 128 tokens; capping output and
+# decoding deterministically keeps the serial decode phase short
+_TOKENS_PER_TASK = 128
+_GENERATION_KWARGS = dict(
+    response_mime_type="application/json",
+    response_schema=_TASK_SCHEMA,
+    temperature=0.0,
+    top_p=1.0,
+)
+
+@st.cache_resource(show_spinner=False)
 def init_vertex_ai():
-    try:
-        # Debug credentials
-        if 'gcp_service_account' not in st.secrets:
-            st.error("No GCP credentials found in secrets")
-            return None
-            
-        credentials = service_account.Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"]
-        )
-        
-        vertexai.init(
-            project="tidal-repeater-441619-n3",
-            location="us-central1",
-            credentials=credentials
-        )
-        return GenerativeModel("gemini-1.5-pro")
-    except Exception as e:
-        st.error(f"Vertex AI initialization error: {e}")
-        return None
-    
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    """Build the credentialed Gemini model once per server process.
+
+    Raises on failure - st.cache_resource does not cache raised errors,
+    so a transient init problem is retried on the next call instead of
+    pinning a broken result for the worker's lifetime.
+    """
+    if 'gcp_service_account' not in st.secrets:
+        raise RuntimeError("No GCP credentials found in secrets")
+
+    credentials = service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"]
+    )
+
+    vertexai.init(
+        project="tidal-repeater-441619-n3",
+        location="us-central1",
+        credentials=credentials
+    )
     return GenerativeModel("gemini-1.5-pro")
 
 # Initialize session state
 def init_session_state():
-    if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
-    if 'user' not in st.session_state:
-        st.session_state.user = None
-    if 'show_login' not in st.session_state:
-        st.session_state.show_login = True
-    if 'active_tasks' not in st.session_state:
-        st.session_state.active_tasks = []
-    if 'completed_tasks' not in st.session_state:
-        st.session_state.completed_tasks = []
-
-def query_gemini(prompt):
+    defaults = {
+        'authenticated': False,
+        'user': None,
+        'show_login': True,
+        # Unique per session so a fresh session can never key into a
+        # stale snapshot another session left in the process-wide cache
+        'tasks_version': time.time_ns(),
+    }
+    for key, value in defaults.items():
+        st.session_state.setdefault(key, value)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_get_tasks(user_id, status, version):
+    """Cached task fetch; bump st.session_state.tasks_version to invalidate"""
+    return db.get_tasks(user_id, status)
+
+def query_gemini(prompt, max_output_tokens=_TOKENS_PER_TASK):
     try:
         model = init_vertex_ai()
-        st.write("Model initialized")  # Debug log
-        
-        response = model.generate_content(prompt)
-        st.write("Response received")  # Debug log
-        
+    except Exception as e:
+        st.error(f"Vertex AI initialization error: {e}")
+        return None
+
+    if model is None:
+        st.error("Vertex AI model unavailable")
+        return None
+
+    try:
+        config = GenerationConfig(max_output_tokens=max_output_tokens, **_GENERATION_KWARGS)
+        response = model.generate_content(prompt, generation_config=config)
+
         if not response or not response.text:
             st.error("Empty response from model")
             return None
@@ -69,65 +114,68 @@ def query_gemini(prompt):
         st.error(f"Detailed error in query_gemini: {str(e)}")
         return None
 
-def parse_task(note):
-    """Parse a note into a structured task using Gemini"""
+def parse_tasks_batch(notes):
+    """Parse multiple notes into structured tasks with a single Gemini call"""
+    if not notes:
+        return None
+
     system_prompt = """You are a task parsing assistant. Extract structured information from notes and return it in JSON format.
-Return only a valid JSON object without any additional text or formatting.
+Return only a valid JSON array with exactly one object per numbered note, in the same order, without any additional text or formatting.
 Format your response exactly like this example:
-{"task": "Send project report", "customer": "John", "due_date": "14-11-2024", "priority": "Medium"}
+[{"task": "Send project report", "customer": "John", "due_date": "2024-11-14", "priority": "Medium"}]
 
 Rules:
 - Task should be very brief and to the point
 - To whom the job intended should be the customer name
 - If "today" mentioned then pull today date in India
 - If "tomorrow" mentioned get today date in india and add 1 day to it.
-- If no date mentioned, use tomorrow's date: {tomorrow_date.strftime('%d-%m-%Y')}
-- Return ONLY the JSON object, no other text
+- Return ONLY the JSON array, no other text
 - If no date is mentioned, use tomorrow's date
 - If no priority indicators, use "Medium"
 - If no person is mentioned, use "Unspecified"
 - Priority can only be "High", "Medium", or "Low"
-- Date format must be DD-MM-YYYY
+- Date format must be YYYY-MM-DD
 """
 
-    user_prompt = f"{system_prompt}\n\nNote to parse: {note}\n\nResponse (JSON only):"
-    
+    numbered_notes = "\n".join(f"{i}. {note}" for i, note in enumerate(notes, start=1))
+    user_prompt = f"{system_prompt}\n\nNotes to parse:\n{numbered_notes}\n\nResponse (JSON array only):"
+
     try:
-        response = query_gemini(user_prompt)
+        response = query_gemini(user_prompt, max_output_tokens=_TOKENS_PER_TASK * len(notes))
         if not response:
             return None
 
         # Clean up the response
         response = response.strip()
-        
-        # Debug the raw response
-        with st.expander("Debug Output", expanded=False):
-            st.text("Raw Response:")
-            st.code(response)
-        
-        # Extract JSON if it's wrapped in code blocks
-        if "```" in response:
-            response = response.split("```")[1]
-            if response.startswith("json"):
-                response = response[4:]
-        response = response.strip('`').strip()
-        
-        # Parse JSON
+        log.debug("gemini response: %s", response)
+
+        # The response schema guarantees bare JSON - parse it directly
         parsed = json.loads(response)
-        
-        # Handle date format
-        if parsed.get('due_date', '').lower() == 'tomorrow':
-            tomorrow = datetime.now() + timedelta(days=1)
-            parsed['due_date'] = tomorrow.strftime('%d-%m-%Y')
-        
-        # Validate required fields
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+
+        # Validate required fields on every element
         required_fields = ['task', 'customer', 'due_date', 'priority']
-        if not all(field in parsed for field in required_fields):
-            st.error("Missing required fields in response")
-            return None
-            
+        for task in parsed:
+            if not all(field in task for field in required_fields):
+                st.error("Missing required fields in response")
+                return None
+
+            # Handle date format
+            due = task.get('due_date', '')
+            if due.lower() == 'tomorrow':
+                tomorrow = datetime.now() + timedelta(days=1)
+                due = tomorrow.strftime('%Y-%m-%d')
+            else:
+                # Normalize if the model still answers in DD-MM-YYYY
+                try:
+                    due = datetime.strptime(due, '%d-%m-%Y').strftime('%Y-%m-%d')
+                except ValueError:
+                    pass
+            task['due_date'] = due
+
         return parsed
-        
+
     except json.JSONDecodeError as e:
         st.error(f"Invalid JSON format: {e}")
         return None
@@ -135,23 +183,145 @@ Rules:
         st.error(f"Error: {e}")
         return None
 
-def check_overdue(due_date_str):
-    """Check if a task is overdue"""
-    try:
-        due = datetime.strptime(due_date_str, '%d-%m-%Y')
-        return due.date() < datetime.now().date()
-    except:
-        return False
+def parse_task(note):
+    """Parse a single note into a structured task using Gemini"""
+    tasks = parse_tasks_batch([note])
+    return tasks[0] if tasks else None
+
+@st.fragment
+def render_task_form(user_id):
+    """Task input form - only this fragment triggers the Gemini call"""
+    with st.form("task_form"):
+        note_input = st.text_area(
+            "Enter your task note:",
+            placeholder="Example: Write an email to David on ABC project by tomorrow",
+            help="Describe your task naturally. Include person name, due date, and priority if applicable.",
+            key="note_input"
+        )
+
+        submitted = st.form_submit_button("Add Task")
+
+        if submitted and note_input:
+
+            with st.spinner("Processing..."):
+                parsed_task = parse_task(note_input)
+                if parsed_task:
+                    if db.save_task(user_id, parsed_task):
+                        st.session_state.tasks_version += 1
+                        st.success("Task added successfully!")
+                        st.rerun()
+                    else:
+                        st.error("Error saving task")
+
+    with st.expander("Bulk add"):
+        with st.form("bulk_task_form"):
+            bulk_input = st.text_area(
+                "Enter one task note per line:",
+                placeholder="Send report to David by tomorrow\nCall Priya about the invoice on Friday",
+                key="bulk_input"
+            )
+
+            bulk_submitted = st.form_submit_button("Add Tasks")
+
+            if bulk_submitted and bulk_input:
+                notes = [line.strip() for line in bulk_input.splitlines() if line.strip()]
+
+                if not notes:
+                    st.warning("Enter at least one task note")
+                else:
+                    with st.spinner("Processing..."):
+                        parsed_tasks = parse_tasks_batch(notes)
+                        if parsed_tasks:
+                            if db.save_tasks_bulk(user_id, parsed_tasks):
+                                st.session_state.tasks_version += 1
+                                st.success(f"Added {len(parsed_tasks)} tasks!")
+                                st.rerun()
+                            else:
+                                st.error("Error saving tasks")
+
+@st.fragment
+def render_active_tasks(user_id):
+    """Display the active task table"""
+    active_tasks = cached_get_tasks(user_id, 'active', st.session_state.tasks_version)
+    if not active_tasks:
+        st.info("No active tasks!")
+        return
+
+    df = pd.DataFrame(active_tasks)
+    # ISO dates compare as strings, no per-row parsing needed
+    df['overdue'] = df['due_date'] < date.today().isoformat()
+    df['done'] = False
+
+    def style_overdue(row):
+        return ['color: red'] * len(row) if row['overdue'] else [''] * len(row)
+
+    # One editable table instead of one button widget per row; ticking
+    # the Done checkbox completes that task
+    edited = st.data_editor(
+        df.style.apply(style_overdue, axis=1),
+        column_config={
+            "id": None,
+            "overdue": None,
+            "completion_date": None,
+            "task": st.column_config.TextColumn("Task"),
+            "customer": st.column_config.TextColumn("Customer"),
+            "due_date": st.column_config.TextColumn("Due Date"),
+            "priority": st.column_config.TextColumn("Priority"),
+            "done": st.column_config.CheckboxColumn("Done"),
+        },
+        disabled=[c for c in df.columns if c != 'done'],
+        hide_index=True,
+        use_container_width=True,
+        key="active_task_editor",
+    )
+
+    newly_done = edited.loc[edited['done'] & ~df['done'], 'id']
+    if not newly_done.empty:
+        completed = sum(1 for task_id in newly_done
+                        if db.complete_task(user_id, int(task_id)))
+        if completed:
+            st.session_state.tasks_version += 1
+            st.success(f"Completed {completed} task(s)!")
+            st.rerun(scope="fragment")
+
+@st.fragment
+def render_completed_tasks(user_id):
+    """Display the completed task table"""
+    # Tabs render their children even when hidden, so gate the query
+    # behind a toggle - the completed list is only fetched on demand
+    if not st.toggle("Show completed tasks", key="show_completed"):
+        return
+
+    completed_tasks = cached_get_tasks(user_id, 'completed', st.session_state.tasks_version)
+    if not completed_tasks:
+        st.info("No completed tasks!")
+        return
+
+    df = pd.DataFrame(completed_tasks)
+    st.dataframe(
+        df,
+        column_config={
+            "id": None,
+            "priority": None,
+            "task": st.column_config.TextColumn("Task"),
+            "customer": st.column_config.TextColumn("Customer"),
+            "due_date": st.column_config.TextColumn("Due Date"),
+            "completion_date": st.column_config.TextColumn("Completed On"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
 
 # Main function remains the same as your original code
 def main():
     # Initialize session state
     init_session_state()
-    
+    today_iso = date.today().isoformat()
+
     if not st.session_state.authenticated:
         # Show login/registration pages
         tab1, tab2 = st.tabs(["Login", "Register"])
-        
+
         with tab1:
             auth.login_page()
         with tab2:
@@ -160,149 +330,44 @@ def main():
 
     # Main app - only shown when authenticated
     st.sidebar.success(f"Welcome {st.session_state.user['email']}!")
-    
+
     if st.sidebar.button("Logout"):
         st.session_state.clear()
         st.rerun()
 
     st.title("📝 Smart Task Manager")
 
-    # Task input form
-    with st.form("task_form"):
-        note_input = st.text_area(
-            "Enter your task note:",
-            placeholder="Example: Write an email to David on ABC project by tomorrow",
-            help="Describe your task naturally. Include person name, due date, and priority if applicable.",
-            key="note_input"
-        )
-        
-        submitted = st.form_submit_button("Add Task")
-        
-        if submitted and note_input:
-            
-            with st.spinner("Processing..."):
-                parsed_task = parse_task(note_input)
-                if parsed_task:
-                    if db.save_task(st.session_state.user['id'], parsed_task):
-                        st.success("Task added successfully!")
-                        st.rerun()
-                    else:
-                        st.error("Error saving task")
+    user_id = st.session_state.user['id']
+    render_task_form(user_id)
 
     # Display tasks in tabs
     tab1, tab2 = st.tabs(["Active Tasks 📝", "Completed Tasks ✅"])
-    
+
     try:
-        # Fetch tasks
-        user_id = st.session_state.user['id']
-        active_tasks = db.get_tasks(user_id, status='active')
-        completed_tasks = db.get_tasks(user_id, status='completed')
-        
         with tab1:
-            if active_tasks:
-                # Table headers
-                header_cols = st.columns([0.5, 2, 1, 1, 0.5])
-                with header_cols[0]:
-                    st.markdown("**Status**")
-                with header_cols[1]:
-                    st.markdown("**Task**")
-                with header_cols[2]:
-                    st.markdown("**Customer**")
-                with header_cols[3]:
-                    st.markdown("**Due Date**")
-                with header_cols[4]:
-                    st.markdown("**Action**")
-                
-                # Add a line after headers
-                st.markdown("<hr style='margin: 5px 0; border: 1px solid #f0f2f6'>", unsafe_allow_html=True)
-        
-                for task in active_tasks:
-                    col1, col2, col3, col4, col5 = st.columns([0.5, 2, 1, 1, 0.5])
-                    
-                    # Check if task is overdue
-                    is_overdue = check_overdue(task['due_date'])
-                    overdue_style = "color: red;" if is_overdue else ""
-                    
-                    with col1:
-                        st.write("🚩" if is_overdue else "✅")
-                    
-                    with col2:
-                        st.markdown(f"<span style='{overdue_style}'>{task['task']}</span>", 
-                                  unsafe_allow_html=True)
-                    
-                    with col3:
-                        st.write(task['customer'])
-                    
-                    with col4:
-                        st.markdown(f"<span style='{overdue_style}'>{task['due_date']}</span>",
-                                  unsafe_allow_html=True)
-                    
-                    with col5:
-                        if st.button("✓", key=f"complete_{task['id']}"):
-                            if db.complete_task(user_id, task['id']):
-                                st.success("Task completed!")
-                                st.rerun()
-                    
-                    st.markdown("---")
-            else:
-                st.info("No active tasks!")
-        
+            render_active_tasks(user_id)
+
         with tab2:
-            if completed_tasks:
-                # Table headers for completed tasks
-                header_cols = st.columns([0.5, 2, 1, 1, 1])
-                with header_cols[0]:
-                    st.markdown("**Status**")
-                with header_cols[1]:
-                    st.markdown("**Task**")
-                with header_cols[2]:
-                    st.markdown("**Customer**")
-                with header_cols[3]:
-                    st.markdown("**Due Date**")
-                with header_cols[4]:
-                    st.markdown("**Completed On**")
-        
-                # Add a line after headers
-                st.markdown("<hr style='margin: 5px 0; border: 1px solid #f0f2f6'>", unsafe_allow_html=True)
-                for task in completed_tasks:
-                    col1, col2, col3, col4, col5 = st.columns([0.5, 2, 1, 1, 1])
-                    
-                    with col1:
-                        st.write("✓")
-                    with col2:
-                        st.write(task['task'])
-                    with col3:
-                        st.write(task['customer'])
-                    with col4:
-                        st.write(task['due_date'])
-                    with col5:
-                        st.write(f"Completed: {task['completion_date']}")
-                    
-                    st.markdown("---")
-            else:
-                st.info("No completed tasks!")
+            render_completed_tasks(user_id)
 
-        # Sidebar statistics
+        # Sidebar statistics - one aggregate query instead of fetching rows
         with st.sidebar:
             st.subheader("📊 Task Statistics")
-            active_count = len(active_tasks)
-            completed_count = len(completed_tasks)
+            active_count, completed_count, overdue_count = db.get_stats(user_id, today_iso)
             total_count = active_count + completed_count
-            
+
             col1, col2 = st.columns(2)
             with col1:
                 st.metric("Active", active_count)
             with col2:
                 st.metric("Completed", completed_count)
-            
+
             if total_count > 0:
                 completion_rate = (completed_count / total_count) * 100
                 st.progress(completion_rate / 100)
                 st.caption(f"Completion Rate: {completion_rate:.1f}%")
-            
+
             # Show overdue tasks count
-            overdue_count = sum(1 for task in active_tasks 
-                              if check_overdue(task['due_date']))
             if overdue_count > 0:
                 st.error(f"⚠️ Overdue Tasks: {overdue_count}")
 
@@ -3,26 +3,29 @@ import re
 from typing import Tuple
 from database import TaskDB
 
+_EMAIL_RE = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+_PASSWORD_RE = re.compile(r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d).{8,}$')
+
 class Auth:
-    def __init__(self):
-        self.db = TaskDB()
+    def __init__(self, db: TaskDB):
+        self.db = db
 
     def validate_email(self, email: str) -> bool:
         """Validate email format"""
-        pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-        return re.match(pattern, email) is not None
+        return _EMAIL_RE.match(email) is not None
 
     def validate_password(self, password: str) -> Tuple[bool, str]:
         """Validate password strength"""
+        if _PASSWORD_RE.match(password):
+            return True, ""
+        # Only dig for the specific failure once the single-pass check fails
         if len(password) < 8:
             return False, "Password must be at least 8 characters long"
         if not any(c.isupper() for c in password):
             return False, "Password must contain at least one uppercase letter"
         if not any(c.islower() for c in password):
             return False, "Password must contain at least one lowercase letter"
-        if not any(c.isdigit() for c in password):
-            return False, "Password must contain at least one number"
-        return True, ""
+        return False, "Password must contain at least one number"
 
     def login_page(self):
         """Display login page"""
@@ -1,21 +1,37 @@
 import sqlite3
 import hashlib
-import datetime
+import hmac
+import os
+import logging
+import threading
 from typing import Optional
-import streamlit as st
+
+log = logging.getLogger(__name__)
 
 class TaskDB:
     def __init__(self, db_path="task_manager.db"):
         self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
         self.init_database()
 
     def get_connection(self):
-        """Create a database connection"""
+        """Return this thread's persistent database connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL avoids journal setup per write and lets readers run
+            # alongside the single writer
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-20000")
+            self._local.conn = conn
             return conn
         except Exception as e:
-            st.error(f"Database connection error: {e}")
+            log.exception("Database connection error")
             return None
 
     def init_database(self):
@@ -30,7 +46,14 @@ class TaskDB:
                 (id INTEGER PRIMARY KEY,
                  email TEXT UNIQUE NOT NULL,
                  password TEXT NOT NULL,
+                 salt BLOB,
                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+
+                # Add the salt column to databases created before scrypt hashing
+                try:
+                    c.execute("ALTER TABLE users ADD COLUMN salt BLOB")
+                except sqlite3.OperationalError:
+                    pass
                 
                 # Create tasks table
                 c.execute('''
@@ -47,67 +70,72 @@ class TaskDB:
                         FOREIGN KEY (user_id) REFERENCES users (id)
                     )
                 ''')
-                
+
+                # Covering index for the get_tasks filter + sort, plus a
+                # lookup index for login by email
+                c.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_status_due ON tasks(user_id, status, due_date)")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+
+                # One-shot migration: rewrite legacy DD-MM-YYYY due dates as
+                # ISO YYYY-MM-DD so ORDER BY and string comparison sort right
+                c.execute("""
+                    UPDATE tasks
+                    SET due_date = substr(due_date, 7, 4) || '-' || substr(due_date, 4, 2) || '-' || substr(due_date, 1, 2)
+                    WHERE due_date LIKE '__-__-____'
+                """)
+
                 conn.commit()
             except Exception as e:
-                st.error(f"Database initialization error: {e}")
-            finally:
-                conn.close()
+                log.exception("Database initialization error")
 
-    def hash_password(self, password: str) -> str:
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def hash_password(self, password: str, salt: bytes) -> bytes:
+        """Hash password using scrypt with a per-user salt"""
+        return hashlib.scrypt(password.encode(), salt=salt, n=2**14, r=8, p=1, dklen=32)
 
     def register_user(self, email: str, password: str) -> bool:
         """Register a new user"""
         try:
-            print("Registering...")
             conn = self.get_connection()
-            print("Conneted...")
             if conn is not None:
                 c = conn.cursor()
-                hashed_password = self.hash_password(password)
-                print("Email :",email)
-                print("Password :",hashed_password)
-                c.execute(
-                    "INSERT INTO users (email, password) VALUES (?, ?)",
-                    (email, hashed_password)
-                )
-                print("committing...")
-                conn.commit()
+                salt = os.urandom(16)
+                hashed_password = self.hash_password(password, salt)
+                log.debug("registering user %s", email)
+                with self._write_lock:
+                    c.execute(
+                        "INSERT INTO users (email, password, salt) VALUES (?, ?, ?)",
+                        (email, hashed_password, salt)
+                    )
+                    conn.commit()
                 return True
         except sqlite3.IntegrityError:
-            print("Exception..")
+            log.debug("email already registered: %s", email)
             return False
-        finally:
-            if conn:
-                conn.close()
         return False
 
     def verify_user(self, email: str, password: str) -> Optional[dict]:
         """Verify user credentials"""
-        try:
-            conn = self.get_connection()
-            print("Login ...")
-            if conn is not None:
-                c = conn.cursor()
-                hashed_password = self.hash_password(password)
-                print("Email :",email)
-                print("Password :",hashed_password)
-                c.execute(
-                    "SELECT id, email FROM users WHERE email=? AND password=?",
-                    (email, hashed_password)
-                )
-                user = c.fetchone()
-                print("User :",user)
-                if user:
+        conn = self.get_connection()
+        if conn is not None:
+            c = conn.cursor()
+            log.debug("verifying user %s", email)
+            c.execute(
+                "SELECT id, email, password, salt FROM users WHERE email=?",
+                (email,)
+            )
+            user = c.fetchone()
+            if user:
+                user_id, user_email, stored, salt = user
+                if salt is not None:
+                    computed = self.hash_password(password, salt)
+                else:
+                    # Accounts created before the scrypt migration
+                    computed = hashlib.sha256(password.encode()).hexdigest()
+                if hmac.compare_digest(stored, computed):
                     return {
-                        "id": user[0],
-                        "email": user[1]
+                        "id": user_id,
+                        "email": user_email
                     }
-        finally:
-            if conn:
-                conn.close()
         return None
 
     def save_task(self, user_id: int, task_data: dict) -> bool:
@@ -116,23 +144,43 @@ class TaskDB:
         if conn is not None:
             try:
                 c = conn.cursor()
-                c.execute("""
-                    INSERT INTO tasks (user_id, task, customer, due_date, priority)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    user_id,
-                    task_data['task'],
-                    task_data['customer'],
-                    task_data['due_date'],
-                    task_data['priority']
-                ))
-                conn.commit()
+                with self._write_lock:
+                    c.execute("""
+                        INSERT INTO tasks (user_id, task, customer, due_date, priority)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (
+                        user_id,
+                        task_data['task'],
+                        task_data['customer'],
+                        task_data['due_date'],
+                        task_data['priority']
+                    ))
+                    conn.commit()
                 return True
             except Exception as e:
-                st.error(f"Error saving task: {e}")
+                log.exception("Error saving task")
+                return False
+        return False
+
+    def save_tasks_bulk(self, user_id: int, tasks_list: list) -> bool:
+        """Save multiple tasks in a single transaction"""
+        if not tasks_list:
+            return False
+        conn = self.get_connection()
+        if conn is not None:
+            try:
+                c = conn.cursor()
+                with self._write_lock:
+                    c.executemany("""
+                        INSERT INTO tasks (user_id, task, customer, due_date, priority)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, [(user_id, t['task'], t['customer'], t['due_date'], t['priority'])
+                          for t in tasks_list])
+                    conn.commit()
+                return True
+            except Exception as e:
+                log.exception("Error saving tasks")
                 return False
-            finally:
-                conn.close()
         return False
 
     def get_tasks(self, user_id: int, status: str = 'active') -> list:
@@ -156,29 +204,52 @@ class TaskDB:
                     "priority": t[4],
                     "completion_date": t[5]
                 } for t in tasks]
-            finally:
-                conn.close()
+            except Exception as e:
+                log.exception("Error fetching tasks")
         return []
 
+    def get_stats(self, user_id: int, today_iso: str) -> tuple:
+        """Get (active, completed, overdue) counts in a single query"""
+        conn = self.get_connection()
+        if conn is not None:
+            try:
+                c = conn.cursor()
+                c.execute("""
+                    SELECT
+                        SUM(CASE WHEN status='active' THEN 1 ELSE 0 END),
+                        SUM(CASE WHEN status='completed' THEN 1 ELSE 0 END),
+                        SUM(CASE WHEN status='active' AND due_date < ? THEN 1 ELSE 0 END)
+                    FROM tasks
+                    WHERE user_id=?
+                """, (today_iso, user_id))
+                row = c.fetchone()
+                return (row[0] or 0, row[1] or 0, row[2] or 0)
+            except Exception as e:
+                log.exception("Error fetching stats")
+        return (0, 0, 0)
+
     def complete_task(self, user_id: int, task_id: int) -> bool:
         """Mark a task as completed"""
         conn = self.get_connection()
         if conn is not None:
             try:
                 c = conn.cursor()
-                completion_date = datetime.datetime.now().strftime('%d-%m-%Y %H:%M')
-                c.execute("""
-                    UPDATE tasks 
-                    SET status='completed', completion_date=?
-                    WHERE id=? AND user_id=?
-                """, (completion_date, task_id, user_id))
-                conn.commit()
-                return True
+                with self._write_lock:
+                    # Timestamp in SQL and RETURNING to confirm the row
+                    # existed, all in one statement (SQLite >= 3.35)
+                    c.execute("""
+                        UPDATE tasks
+                        SET status='completed',
+                            completion_date=strftime('%d-%m-%Y %H:%M', 'now', 'localtime')
+                        WHERE id=? AND user_id=?
+                        RETURNING id
+                    """, (task_id, user_id))
+                    updated = c.fetchone() is not None
+                    conn.commit()
+                return updated
             except Exception as e:
-                st.error(f"Error completing task: {e}")
+                log.exception("Error completing task")
                 return False
-            finally:
-                conn.close()
         return False
 
     def delete_task(self, user_id: int, task_id: int) -> bool:
@@ -187,12 +258,11 @@ class TaskDB:
         if conn is not None:
             try:
                 c = conn.cursor()
-                c.execute("DELETE FROM tasks WHERE id=? AND user_id=?", (task_id, user_id))
-                conn.commit()
+                with self._write_lock:
+                    c.execute("DELETE FROM tasks WHERE id=? AND user_id=?", (task_id, user_id))
+                    conn.commit()
                 return True
             except Exception as e:
-                st.error(f"Error deleting task: {e}")
+                log.exception("Error deleting task")
                 return False
-            finally:
-                conn.close()
         return False
\ No newline at end of file